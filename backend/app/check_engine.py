@@ -1,10 +1,20 @@
 import re
-import pandas as pd
-from typing import Dict, List, Any, Tuple
+from typing import Dict, List, Any, Iterator
 import logging
+from app.section_extractor import FONTE_RE
 
 logger = logging.getLogger(__name__)
 
+TOTAL_RE = re.compile(r"total", re.IGNORECASE)
+ANUARIO_YEAR_RE = re.compile(r"Anuário\s+Estatístico\s+(\d{4})", re.IGNORECASE)
+# Ancorados nas bordas de números: o motor não tenta casar a partir do meio de cada sequência de dígitos
+INVALID_YEAR_RE = re.compile(r"(?<!\d)20\d{3,}")
+YEAR_SERIES_RE = re.compile(r"\b(\d{4})\s+a\s+(\d{4})\b")
+DOT_DECIMAL_RE = re.compile(r"\b(\d+)\.(\d{1,2})\b")
+TR_RE = re.compile(r"<tr\b[^>]*>.*?</tr\s*>", re.IGNORECASE | re.DOTALL)
+TOTAL_CELL_RE = re.compile(r"<t[dh][^>]*>\s*Total\s*</t[dh]>", re.IGNORECASE)
+HIGHLIGHT_RE = re.compile(r"background|font-weight|<strong|<b>", re.IGNORECASE)
+
 
 class CheckEngine:
     """Engine para rodar as 6 regras de checagem."""
@@ -15,29 +25,29 @@ class CheckEngine:
     
     def run_all_checks(self, section_data: Dict[str, Any], url: str, anchor: str = "") -> List[Dict[str, Any]]:
         """Roda todas as checagens e retorna lista de resultados."""
-        results = []
-        
+        return list(self.iter_all_checks(section_data, url, anchor))
+    
+    def iter_all_checks(self, section_data: Dict[str, Any], url: str, anchor: str = "") -> Iterator[Dict[str, Any]]:
+        """Roda as checagens sob demanda, emitindo cada resultado (dict) assim que é produzido."""
         # R1: Year checks
-        results.extend(self.r1_year_checks(section_data["text"], url, anchor))
+        yield from self.r1_year_checks(section_data["text"], url, anchor)
         
         # R2: Decimal separator
-        results.extend(self.r2_decimal_separator(section_data["text"], url, anchor))
+        yield from self.r2_decimal_separator(section_data["text"], url, anchor)
         
         # Checagens específicas de tabelas
         for table_data in section_data.get("tables", []):
             # R3: Table source required
-            results.extend(self.r3_table_source_required(table_data, url, anchor))
+            yield from self.r3_table_source_required(table_data, url, anchor)
             
             # R4: Table totals
-            results.extend(self.r4_table_totals(table_data, url, anchor))
+            yield from self.r4_table_totals(table_data, url, anchor)
             
             # R5: Table completeness
-            results.extend(self.r5_table_completeness(table_data, url, anchor))
+            yield from self.r5_table_completeness(table_data, url, anchor)
             
             # R6: Total row style
-            results.extend(self.r6_total_row_style(table_data, url, anchor))
-        
-        return results
+            yield from self.r6_total_row_style(table_data, url, anchor)
     
     # ===== R1: Year Checks =====
     def r1_year_checks(self, text: str, url: str, anchor: str = "") -> List[Dict[str, Any]]:
@@ -49,11 +59,11 @@ class CheckEngine:
         - FAIL se série truncada (ex: "2020 a 2023" quando base_year=2024)
         """
         results = []
+        # Presença do ano-base no texto: uma única varredura, reaproveitada pelas checagens abaixo
+        has_base_year = str(self.base_year) in text
         
         # FAIL: encontrar "Anuário Estatístico YYYY" com ano errado
-        pattern_anuario = r"Anuário\s+Estatístico\s+(\d{4})"
-        matches = re.finditer(pattern_anuario, text, re.IGNORECASE)
-        for match in matches:
+        for match in ANUARIO_YEAR_RE.finditer(text):
             year_str = match.group(1)
             if int(year_str) != self.report_year:
                 results.append({
@@ -68,8 +78,7 @@ class CheckEngine:
                 })
         
         # FAIL: encontrar anos inválidos (20234, etc)
-        pattern_invalid = r"20\d{3,}"
-        for match in re.finditer(pattern_invalid, text):
+        for match in INVALID_YEAR_RE.finditer(text):
             year_str = match.group(0)
             results.append({
                 "rule": "R1_invalid_year_format",
@@ -84,7 +93,7 @@ class CheckEngine:
         
         # WARN: 2023 aparece mas 2024 não (se base_year=2024)
         if self.base_year == 2024:
-            if "2023" in text and "2024" not in text:
+            if not has_base_year and "2023" in text:
                 results.append({
                     "rule": "R1_missing_base_year",
                     "severity": "WARN",
@@ -97,11 +106,10 @@ class CheckEngine:
                 })
         
         # FAIL: série truncada (ex: "2020 a 2023" quando base_year=2024)
-        pattern_series = r"(\d{4})\s+a\s+(\d{4})"
-        for match in re.finditer(pattern_series, text):
+        for match in YEAR_SERIES_RE.finditer(text):
             start_year = int(match.group(1))
             end_year = int(match.group(2))
-            if end_year == self.base_year - 1 and self.base_year not in text:
+            if end_year == self.base_year - 1 and not has_base_year:
                 results.append({
                     "rule": "R1_truncated_series",
                     "severity": "FAIL",
@@ -126,24 +134,26 @@ class CheckEngine:
         
         # Procura padrão: número com ponto que não é milhares
         # Heurística: X.YY onde YY tem 1-2 dígitos (decimal, não milhares)
-        pattern = r"\b(\d+)\.(\d{1,2})\b"
-        matches = list(re.finditer(pattern, text))
-        
-        if matches:
-            # Se encontrou alguns matches, avisar
-            sample_matches = matches[:3]
-            snippets = []
-            for match in sample_matches:
-                snippet = text[max(0, match.start()-30):match.end()+30]
+        # Uma passada só: guarda o primeiro match e até 3 exemplos, o resto apenas conta
+        first = None
+        snippets = []
+        count = 0
+        for match in DOT_DECIMAL_RE.finditer(text):
+            if first is None:
+                first = match
+            if count < 3:
                 snippets.append(f"'{match.group(0)}'")
-            
+            count += 1
+        
+        if count:
+            # Se encontrou alguns matches, avisar (até 3 exemplos)
             results.append({
                 "rule": "R2_decimal_separator",
                 "severity": "WARN",
                 "message": f"Decimal com ponto detectado. Verificar se é decimal (15.84) ou milhares. Exemplos: {', '.join(snippets)}",
                 "evidence": {
-                    "text_snippet": text[matches[0].start()-50:matches[0].end()+50],
-                    "count_matches": len(matches),
+                    "text_snippet": text[max(0, first.start()-50):first.end()+50],
+                    "count_matches": count,
                     "url": url,
                     "anchor": anchor,
                 }
@@ -159,7 +169,12 @@ class CheckEngine:
         caption = table_data.get("caption", "")
         notes = table_data.get("notes_text", "")
         
-        if "Fonte:" not in caption and "Fonte:" not in notes:
+        # "Fonte:" já procurado pelo SectionExtractor; tabelas de outra origem são varridas aqui
+        has_source = table_data.get("has_source")
+        if has_source is None:
+            has_source = bool(FONTE_RE.search(caption) or FONTE_RE.search(notes))
+        
+        if not has_source:
             results.append({
                 "rule": "R3_table_source_required",
                 "severity": "FAIL",
@@ -185,9 +200,8 @@ class CheckEngine:
         
         # Procura linha "Total"
         total_row_idx = None
-        for idx, row in df.iterrows():
-            first_cell = str(row.iloc[0]).lower().strip()
-            if "total" in first_cell:
+        for idx, first_cell in df.iloc[:, 0].items():
+            if TOTAL_RE.search(str(first_cell)):
                 total_row_idx = idx
                 break
         
@@ -195,10 +209,11 @@ class CheckEngine:
             # Recalcular totais para colunas numéricas
             try:
                 numeric_cols = df.select_dtypes(include=["number"]).columns
+                # Somas de todas as colunas numéricas (exceto a linha Total) numa única operação vetorizada
+                computed_sums = df.loc[df.index != total_row_idx, numeric_cols].sum()
                 for col in numeric_cols:
                     try:
-                        # Somar todas as linhas exceto a última (Total)
-                        computed_sum = df.loc[~df.index.isin([total_row_idx]), col].sum()
+                        computed_sum = computed_sums[col]
                         reported_value = df.loc[total_row_idx, col]
                         
                         # Permitir pequena margem de erro (arredondamento)
@@ -248,11 +263,12 @@ class CheckEngine:
             return results
         
         # Procura "ND" (Dado Não Disponível)
-        nd_count = 0
-        for col in df.columns:
-            for val in df[col]:
-                if str(val).strip().upper() == "ND":
-                    nd_count += 1
+        nd_count = int(
+            df.astype(str)
+            .apply(lambda col: col.str.strip().str.upper().eq("ND"))
+            .to_numpy()
+            .sum()
+        )
         
         if nd_count > 0:
             if "ND:" not in notes and "não disponível" not in notes.lower():
@@ -291,20 +307,19 @@ class CheckEngine:
         results = []
         
         table_html = table_data.get("table_html", "")
+        # Sem "total" em lugar nenhum da tabela não há linha a examinar
+        if not TOTAL_RE.search(table_html):
+            return results
         
-        # Procura <tr> com "Total" e verifica se tem destaque
-        pattern_tr = r'<tr[^>]*>.*?<t[dh][^>]*>\s*Total\s*</t[dh]>.*?</tr>'
-        
-        for match in re.finditer(pattern_tr, table_html, re.IGNORECASE | re.DOTALL):
+        # Procura <tr> com "Total" e verifica se tem destaque.
+        # Cada linha é casada uma vez e a célula Total é buscada só dentro dela (varredura linear)
+        for match in TR_RE.finditer(table_html):
             tr_content = match.group(0)
+            if not TOTAL_CELL_RE.search(tr_content):
+                continue
             
-            # Verificar se tem background, font-weight, <strong>, <b>
-            has_style = any([
-                "background" in tr_content.lower(),
-                "font-weight" in tr_content.lower(),
-                "<strong>" in tr_content.lower() or "<strong" in tr_content.lower(),
-                "<b>" in tr_content.lower(),
-            ])
+            # Verificar se tem background, font-weight, <strong>, <b> (sem copiar a linha em minúsculas)
+            has_style = HIGHLIGHT_RE.search(tr_content) is not None
             
             if not has_style:
                 results.append({
@@ -0,0 +1,17 @@
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from app.config import USER_AGENT
+
+# Sessão compartilhada pelos extratores: o pool do urllib3 mantém as conexões abertas,
+# então páginas do mesmo host não pagam um novo handshake TCP/TLS a cada download
+session = requests.Session()
+session.headers.update({"User-Agent": USER_AGENT})
+
+_adapter = HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=20,
+    max_retries=Retry(total=2, backoff_factor=0.2, allowed_methods=["GET", "HEAD"]),
+)
+session.mount("https://", _adapter)
+session.mount("http://", _adapter)
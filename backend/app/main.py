@@ -1,14 +1,69 @@
 import re
+import asyncio
+import codecs
+import gzip
+import hashlib
+import os
+import sys
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager
+from functools import lru_cache
 from typing import List, Dict, Tuple, Optional, Any
-import requests
-from bs4 import BeautifulSoup
+import httpx
+from bs4 import BeautifulSoup, SoupStrainer
 from datetime import datetime
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse, StreamingResponse
-from pydantic import BaseModel
+from fastapi.responses import HTMLResponse, ORJSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field
 
-app = FastAPI(title="Auditoria Anuário UnB")
+# lxml (C) é bem mais rápido; sem ele, o parser puro-Python da stdlib ainda funciona
+try:
+    from lxml import etree, html as lxml_html
+    HTML_PARSER = "lxml"
+except ImportError:
+    lxml_html = None
+    HTML_PARSER = "html.parser"
+
+# HTTP/2 multiplexa as auditorias de um mesmo host numa conexão; sem o pacote h2, fica no HTTP/1.1
+try:
+    import h2  # noqa: F401
+    HTTP2_ENABLED = True
+except ImportError:
+    HTTP2_ENABLED = False
+
+# Cliente HTTP assíncrono compartilhado (pool de conexões reaproveitado entre auditorias)
+http_client: Optional[httpx.AsyncClient] = None
+# Análise (parse + regras) segura o GIL: roda em processos separados
+audit_executor: Optional[ProcessPoolExecutor] = None
+# Cada worker do uvicorn (WEB_CONCURRENCY) tem seu pool: os núcleos são divididos entre eles
+WEB_CONCURRENCY = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+AUDIT_WORKERS = max(1, (os.cpu_count() or 1) // WEB_CONCURRENCY)
+AUDIT_TASKS_PER_CHILD = 64  # recicla o processo para limitar fragmentação de memória
+# Auditorias de lote simultâneas, somando todos os lotes do worker
+AUDIT_BATCH_CONCURRENCY = 10
+AUDIT_BATCH_MAX_URLS = 50
+audit_batch_sem: Optional[asyncio.Semaphore] = None
+
+def new_audit_executor() -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(max_workers=AUDIT_WORKERS, max_tasks_per_child=AUDIT_TASKS_PER_CHILD)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global http_client, audit_executor, audit_batch_sem
+    http_client = httpx.AsyncClient(timeout=30, follow_redirects=True, http2=HTTP2_ENABLED)
+    audit_executor = new_audit_executor()
+    audit_batch_sem = asyncio.Semaphore(AUDIT_BATCH_CONCURRENCY)
+    # Aquece um processo: a primeira auditoria não paga spawn + imports
+    audit_executor.submit(analyze_html, "", 0)
+    yield
+    await http_client.aclose()
+    audit_executor.shutdown(cancel_futures=True)
+
+app = FastAPI(title="Auditoria Anuário UnB", lifespan=lifespan, default_response_class=ORJSONResponse)
 app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_credentials=True, allow_methods=["*"], allow_headers=["*"])
 
 class AuditRequest(BaseModel):
@@ -16,118 +71,309 @@ class AuditRequest(BaseModel):
     report_year: int
     base_year: int
 
-WEIRD_CHARS_RE = re.compile(r'[\u0000-\u001f\u007f\uFFFD\u00AD\u200B\u200E\u200F\u2028\u2029]')
+class BatchAuditRequest(BaseModel):
+    urls: List[str] = Field(max_length=AUDIT_BATCH_MAX_URLS)
+    report_year: int
+    base_year: int
+
+# Controles invisíveis; \t\n\v\f\r e os separadores de linha ficam para WHITESPACE_RE virarem espaço
+WEIRD_CHARS_RE = re.compile(r'[\u0000-\u0008\u000e-\u001f\u007f\uFFFD\u00AD\u200B\u200E\u200F]')
+WHITESPACE_RE = re.compile(r"\s+")
+TOTAL_ROW_RE = re.compile(r'^\s*total\b', re.IGNORECASE)
+YEAR_HEADER_RE = re.compile(r'^20\d{2}$')
+TABLES_ONLY = SoupStrainer("table")
+CELL_TAGS = ["td", "th"]
+TABLE_BLOCK_RE = re.compile(r'<table\b.*?</table\s*>', re.IGNORECASE | re.DOTALL)
+TABLE_OPEN_RE = re.compile(r'<table\b', re.IGNORECASE)
+# Markup que o navegador não renderiza: <table> dentro dele (HTML comentado, document.write) não é tabela
+NON_RENDERED_RE = re.compile(r'<!--.*?-->|<(script|style|template)\b.*?</\1\s*>', re.IGNORECASE | re.DOTALL)
 
 def normalize_text(s: str) -> str:
     if s is None:
         return ""
     s = s.replace("\xa0", " ").replace("\u00a0", " ")
+    # ASCII imprimível não tem caractere estranho nem espaço além do ' ' simples
+    if s.isascii() and s.isprintable():
+        return " ".join(s.split())
     s = WEIRD_CHARS_RE.sub("", s)
-    return re.sub(r"\s+", " ", s).strip()
+    return WHITESPACE_RE.sub(" ", s).strip()
+
+# Formatos numéricos pt-BR numa única alternação, na ordem de prioridade (o primeiro que casa vence)
+NUMBER_PTBR_RE = re.compile(
+    r'(?P<milhar>\d{1,3}(?:\.\d{3})+)'             # 1.769.277
+    r'|(?P<milhar_dec>\d{1,3}(?:\.\d{3})*,\d+)'    # 1.769,27
+    r'|(?P<dec_virgula>\d+,\d+)'                    # 15,84
+    r'|(?P<dec_ponto>\d+\.\d+)'                     # 15.84
+    r'|(?P<inteiro>\d+)'
+)
 
+# Células se repetem muito entre tabelas ("0", "-", anos...): memoiza pelo texto da célula
+@lru_cache(maxsize=8192)
 def parse_number_ptbr(s: str) -> Optional[Any]:
     if not s or not isinstance(s, str):
         return None
     s = normalize_text(s)
-    s = re.sub(r'[%]$', '', s).strip()
-    if re.match(r'^\d{1,3}(\.\d{3})+$', s):
-        return int(s.replace('.', ''))
-    if re.match(r'^\d{1,3}(\.\d{3})*,\d+$', s):
-        try:
-            return float(s.replace('.', '').replace(',', '.'))
-        except:
+    if s.endswith("%"):
+        s = s[:-1].rstrip()
+    # Todos os formatos começam e terminam em dígito
+    if not s or not (s[0].isdigit() and s[-1].isdigit()):
+        return None
+    try:
+        # Inteiro puro é o caso mais comum
+        if s.isdecimal():
+            return int(s)
+        m = NUMBER_PTBR_RE.fullmatch(s)
+        if not m:
             return None
-    if re.match(r'^\d+,\d+$', s):
-        try:
+        kind = m.lastgroup
+        if kind == "milhar":
+            return int(s.replace('.', ''))
+        if kind == "milhar_dec":
+            return float(s.replace('.', '').replace(',', '.'))
+        if kind == "dec_virgula":
             return float(s.replace(',', '.'))
-        except:
-            return None
-    if re.match(r'^\d+\.\d+$', s):
-        try:
+        if kind == "dec_ponto":
             return float(s)
-        except:
-            return None
-    if re.match(r'^\d+$', s):
-        try:
-            return int(s)
-        except:
-            return None
-    return None
+        return int(s)
+    except ValueError:
+        # int() recusa strings com mais de 4300 dígitos
+        return None
+
+# Cache de páginas baixadas: url -> {html, diag, etag, last_modified, fetched_at}
+PAGE_CACHE_TTL = 60  # segundos sem revalidar no servidor
+PAGE_CACHE_MAXSIZE = 32  # páginas mantidas; a menos usada recentemente sai primeiro
+# Teto de caracteres somando todas as páginas em cache; página maior que ele não é guardada
+PAGE_CACHE_MAX_CHARS = 16 * 1024 * 1024
+_page_cache: OrderedDict = OrderedDict()
+_page_cache_chars = 0
+
+MAX_PAGE_BYTES = 32 * 1024 * 1024  # páginas maiores são recusadas
+# Tipos aceitos como página; xlsx/docx/svg também têm "xml" no nome e ficam de fora
+PAGE_MEDIA_TYPES = {"text/html", "application/xhtml+xml", "application/xml", "text/xml", "text/plain"}
 
-def download_page(url: str) -> Tuple[str, Dict]:
+async def read_text_capped(resp: httpx.Response) -> str:
+    """Lê e decodifica o corpo em blocos à medida que chegam, abortando assim que passar de MAX_PAGE_BYTES"""
+    limit_msg = f"página maior que {MAX_PAGE_BYTES // (1024 * 1024)} MB"
+    declared = resp.headers.get("Content-Length", "")
+    if declared.isdigit() and int(declared) > MAX_PAGE_BYTES:
+        raise ValueError(limit_msg)
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    parts = []
+    received = 0
+    async for chunk in resp.aiter_bytes():
+        received += len(chunk)
+        if received > MAX_PAGE_BYTES:
+            raise ValueError(limit_msg)
+        parts.append(decoder.decode(chunk))
+    parts.append(decoder.decode(b"", final=True))
+    return "".join(parts)
+
+async def download_page(url: str) -> Tuple[str, Dict]:
+    global _page_cache_chars
+    cached = _page_cache.get(url)
+    if cached:
+        _page_cache.move_to_end(url)
+    now = time.monotonic()
+    if cached and now - cached["fetched_at"] < PAGE_CACHE_TTL:
+        return cached["html"], cached["diag"]
+    
     headers = {
         "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
         "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
         "Accept-Language": "pt-BR,pt;q=0.9",
     }
+    # GET condicional: se a página não mudou o servidor responde 304 sem corpo
+    if cached:
+        if cached["etag"]:
+            headers["If-None-Match"] = cached["etag"]
+        if cached["last_modified"]:
+            headers["If-Modified-Since"] = cached["last_modified"]
     try:
-        resp = requests.get(url, timeout=30, headers=headers)
-        resp.encoding = "utf-8"
-        html = resp.text
-        soup = BeautifulSoup(html, "html.parser")
-        tables = soup.find_all("table")
-        return html, {"tamanho_html_kb": len(html) / 1024, "contagem_tables": len(tables), "status": "OK"}
+        async with http_client.stream("GET", url, headers=headers) as resp:
+            if cached and resp.status_code == 304:
+                cached["fetched_at"] = now
+                return cached["html"], cached["diag"]
+            # PDF, planilha etc.: recusa pelo cabeçalho, sem baixar o corpo
+            content_type = resp.headers.get("Content-Type", "").lower()
+            media_type = content_type.split(";")[0].strip()
+            if media_type and media_type not in PAGE_MEDIA_TYPES:
+                raise ValueError(f"conteúdo não é HTML ({content_type})")
+            html = await read_text_capped(resp)
+        diag = {"tamanho_html_kb": len(html) / 1024, "status": "OK", "sucesso": resp.is_success}
+        if resp.is_success:
+            old = _page_cache.pop(url, None)
+            if old is not None:
+                _page_cache_chars -= len(old["html"])
+            if len(html) <= PAGE_CACHE_MAX_CHARS:
+                _page_cache[url] = {
+                    "html": html,
+                    "diag": diag,
+                    "etag": resp.headers.get("ETag"),
+                    "last_modified": resp.headers.get("Last-Modified"),
+                    "fetched_at": now,
+                }
+                _page_cache_chars += len(html)
+                while len(_page_cache) > PAGE_CACHE_MAXSIZE or _page_cache_chars > PAGE_CACHE_MAX_CHARS:
+                    _, evicted = _page_cache.popitem(last=False)
+                    _page_cache_chars -= len(evicted["html"])
+        return html, diag
     except Exception as e:
-        return "", {"tamanho_html_kb": 0, "contagem_tables": 0, "status": f"ERRO: {str(e)}"}
+        return "", {"tamanho_html_kb": 0, "status": f"ERRO: {str(e)}", "sucesso": False}
+
+def slice_tables_html(html: str) -> Optional[str]:
+    """Recorta só os blocos <table>…</table>; None se houver tabela aninhada ou sem fechamento"""
+    blocks = TABLE_BLOCK_RE.findall(html)
+    if len(blocks) != sum(1 for _ in TABLE_OPEN_RE.finditer(html)):
+        return None
+    return "".join(blocks)
+
+BLANK_CELLS_SAMPLE = 8  # células vazias guardadas por tabela (a regra mostra até 6)
+
+# Tabela lida do HTML, ainda sem normalizar: (caption ou None, headers, linhas de células)
+RawTable = Tuple[Optional[str], List[str], List[List[str]]]
+
+def lxml_text(elem) -> str:
+    """Texto do elemento; sem filhos (o caso comum), lê .text direto"""
+    if len(elem) == 0:
+        return elem.text or ""
+    return " ".join(elem.itertext())
+
+def read_tables_lxml(markup: str) -> List[RawTable]:
+    """Lê as tabelas direto na árvore do lxml, sem montar a árvore paralela do BeautifulSoup"""
+    root = lxml_html.document_fromstring(markup)
+    # Como o get_text(" ") do BeautifulSoup: sem <script>/<style>, com espaço no lugar deles
+    for elem in root.iter("script", "style"):
+        elem.tail = " " + elem.tail if elem.tail else " "
+    etree.strip_elements(root, "script", "style", with_tail=False)
+    tables = []
+    for table in root.iter("table"):
+        caption = table.find("caption")
+        caption_text = lxml_text(caption) if caption is not None else None
+        thead = table.find("thead")
+        headers = [lxml_text(th) for th in thead.iter("th")] if thead is not None else []
+        tbody = table.find("tbody")
+        if tbody is None:
+            tbody = table
+        # Só filhas diretas do <tr>: não entra em tabelas aninhadas
+        rows = [[lxml_text(cell) for cell in tr if cell.tag in CELL_TAGS] for tr in tbody.iter("tr")]
+        tables.append((caption_text, headers, rows))
+    return tables
+
+def read_tables_bs4(markup: str) -> List[RawTable]:
+    """Mesma leitura via BeautifulSoup (sem lxml instalado, ou documento que o lxml recusa)"""
+    soup = BeautifulSoup(markup, HTML_PARSER, parse_only=TABLES_ONLY)
+    tables = []
+    for table_elem in soup.find_all("table"):
+        caption = table_elem.find("caption", recursive=False)
+        caption_text = caption.get_text(" ", strip=True) if caption else None
+        thead = table_elem.find("thead", recursive=False)
+        headers = [th.get_text(" ", strip=True) for th in thead.find_all("th")] if thead else []
+        tbody = table_elem.find("tbody", recursive=False) or table_elem
+        rows = [
+            [td.get_text(" ", strip=True) for td in tr.find_all(CELL_TAGS, recursive=False)]
+            for tr in tbody.find_all("tr")
+        ]
+        tables.append((caption_text, headers, rows))
+    return tables
 
 def extract_tables_from_html(html: str) -> List[Dict]:
-    soup = BeautifulSoup(html, "html.parser")
+    """Extrai tabelas com headers/células já normalizados (as regras reutilizam esse texto)"""
+    html = NON_RENDERED_RE.sub(" ", html)
+    # O parser só vê os trechos de tabela; no caso ambíguo, o documento inteiro
+    fragment = slice_tables_html(html)
+    if fragment == "":
+        return []
+    markup = html if fragment is None else fragment
+    raw_tables = None
+    if lxml_html is not None:
+        try:
+            raw_tables = read_tables_lxml(markup)
+        except (etree.ParserError, ValueError):
+            # Documento vazio ou com declaração de encoding em str: o BeautifulSoup lida com ambos
+            pass
+    if raw_tables is None:
+        raw_tables = read_tables_bs4(markup)
+    
     tables = []
-    all_tables = soup.find_all("table")
-    for table_idx, table_elem in enumerate(all_tables, 1):
-        caption = table_elem.find("caption")
-        table_name = normalize_text(caption.get_text(" ", strip=True)) if caption else f"Tabela {table_idx}"
-        headers = []
-        thead = table_elem.find("thead")
-        if thead:
-            headers = [normalize_text(th.get_text(" ", strip=True)) for th in thead.find_all("th")]
+    for table_idx, (caption, header_texts, rows) in enumerate(raw_tables, 1):
+        table_name = normalize_text(caption) if caption is not None else f"Tabela {table_idx}"
+        headers = [normalize_text(h) for h in header_texts]
         rows_raw = []
-        tbody = table_elem.find("tbody") or table_elem
-        for tr in tbody.find_all("tr"):
-            tds = tr.find_all(["td", "th"])
-            cells = [normalize_text(td.get_text(" ", strip=True)) for td in tds]
-            if any(c != "" for c in cells):
+        rows_num = []  # mesma forma de rows_raw; None se não numérico
+        # Perfil montado na mesma passada, para as regras não re-varrerem as linhas
+        min_cols = max_cols = 0
+        total_idx = None
+        blank_cells = []
+        for row in rows:
+            # Valores curtos ("0", "-", anos) se repetem muito: internados, o hash é calculado uma vez
+            cells = [sys.intern(t) if len(t) <= 32 else t for t in map(normalize_text, row)]
+            if any(cells):
+                width = len(cells)
+                if not rows_raw:
+                    min_cols = max_cols = width
+                elif width < min_cols:
+                    min_cols = width
+                elif width > max_cols:
+                    max_cols = width
+                if total_idx is None and TOTAL_ROW_RE.match(cells[0]):
+                    total_idx = len(rows_raw)
+                if len(blank_cells) < BLANK_CELLS_SAMPLE and "" in cells:
+                    r_i = len(rows_raw) + 1
+                    for c_i, cell in enumerate(cells, 1):
+                        if cell == "":
+                            blank_cells.append((r_i, c_i))
+                            if len(blank_cells) >= BLANK_CELLS_SAMPLE:
+                                break
                 rows_raw.append(cells)
-        tables.append({"numero": table_idx, "nome": table_name, "headers": headers, "rows_raw": rows_raw, "html": str(table_elem)})
+                rows_num.append([parse_number_ptbr(c) if c else None for c in cells])
+        tables.append({
+            "numero": table_idx, "nome": table_name, "headers": headers, "rows_raw": rows_raw, "rows_num": rows_num,
+            "min_cols": min_cols, "max_cols": max_cols, "total_idx": total_idx, "blank_cells": blank_cells,
+        })
     return tables
 
+def html_digest(html: str) -> bytes:
+    """Hash curto do conteúdo da página, usado como chave de cache"""
+    return hashlib.blake2b(html.encode("utf-8"), digest_size=16).digest()
+
 # ============================================================
 # REGRAS ESPECÍFICAS PARA ERROS DO CAPÍTULO 2
 # ============================================================
 
 def rule_missing_digit_in_number(table: Dict) -> Optional[Dict]:
     """Detecta erro de digitação: número que parece estar faltando dígito (ex: 1031 vs 10031)"""
-    rows = table.get("rows_raw", [])
-    if not rows:
+    rows_num = table.get("rows_num", [])
+    if not rows_num:
         return None
     
-    for r_i, row in enumerate(rows):
-        for c_i, cell in enumerate(row):
-            num = parse_number_ptbr(cell)
-            if num is None or not isinstance(num, int) or num < 100:
-                continue
-            
-            # Procurar se 10x deste número existe na mesma tabela
-            for other_row in rows:
-                for other_cell in other_row:
-                    other_num = parse_number_ptbr(other_cell)
-                    if other_num and isinstance(other_num, int):
-                        # Se um número é exatamente 10x o outro, suspeita de dígito faltante
-                        if other_num == num * 10 and 1000 <= num <= 2000:
-                            return {
-                                "severity": "FAIL",
-                                "table": table["nome"],
-                                "rule": "missing_digit",
-                                "issue": "Possível erro de digitação (dígito faltante)",
-                                "detail": f"Valor '{num}' pode ser '{int(num*10)}' (10x maior aparece na tabela)",
-                                "recommendation": "Verificar se número não tem dígito faltante."
-                            }
+    # Uma passada pelas células: todos os inteiros num set (a busca pelo "10x maior" vira O(1))
+    # e, na ordem da tabela, só os que estão na faixa suspeita
+    ints = set()
+    suspects = []
+    for row in rows_num:
+        for v in row:
+            if v and isinstance(v, int):
+                ints.add(v)
+                if 1000 <= v <= 2000:
+                    suspects.append(v)
+    
+    for num in suspects:
+        # Se um número é exatamente 10x o outro, suspeita de dígito faltante
+        if num * 10 in ints:
+            return {
+                "severity": "FAIL",
+                "table": table["nome"],
+                "rule": "missing_digit",
+                "issue": "Possível erro de digitação (dígito faltante)",
+                "detail": f"Valor '{num}' pode ser '{int(num*10)}' (10x maior aparece na tabela)",
+                "recommendation": "Verificar se número não tem dígito faltante."
+            }
     return None
 
 def rule_identical_values_different_periods(table: Dict) -> Optional[Dict]:
     """Detecta valores idênticos em períodos/anos diferentes (suspeitamente igual)"""
     rows = table.get("rows_raw", [])
-    headers = [normalize_text(h) for h in table.get("headers", [])]
+    headers = table.get("headers", [])
     
     if len(rows) < 2:
         return None
@@ -135,32 +381,33 @@ def rule_identical_values_different_periods(table: Dict) -> Optional[Dict]:
     # Procurar por colunas de anos/períodos
     year_cols = []
     for col_idx, header in enumerate(headers):
-        if re.match(r'^20\d{2}$', header) or 'ano' in header.lower():
+        if YEAR_HEADER_RE.match(header) or 'ano' in header.lower():
             year_cols.append((col_idx, header))
     
     if len(year_cols) < 2:
         return None
     
+    rows_num = table.get("rows_num", [])
     for row_idx, row in enumerate(rows):
-        values_by_period = []
+        nums = rows_num[row_idx]
+        # Compara cada valor com o anterior da linha e para no primeiro par idêntico
+        prev = None
         for col_idx, period in year_cols:
             if col_idx < len(row):
-                v = parse_number_ptbr(row[col_idx])
-                if v is not None:
-                    values_by_period.append((period, v, col_idx))
-        
-        # Se valores são idênticos em períodos diferentes
-        if len(values_by_period) >= 2:
-            for i in range(len(values_by_period) - 1):
-                if values_by_period[i][1] == values_by_period[i+1][1]:
+                v = nums[col_idx]
+                if v is None:
+                    continue
+                # Se valores são idênticos em períodos diferentes
+                if prev is not None and prev[1] == v:
                     return {
                         "severity": "WARN",
                         "table": table["nome"],
                         "rule": "duplicate_period_values",
                         "issue": "Valores idênticos em períodos diferentes",
-                        "detail": f"'{row[0]}': {values_by_period[i][0]}={values_by_period[i][1]:.0f} = {values_by_period[i+1][0]}={values_by_period[i+1][1]:.0f}",
+                        "detail": f"'{row[0]}': {prev[0]}={prev[1]:.0f} = {period}={v:.0f}",
                         "recommendation": "Verificar se dados foram copiados ou realmente são iguais."
                     }
+                prev = (period, v)
     
     return None
 
@@ -171,14 +418,17 @@ def rule_missing_field_standardized_table(table: Dict) -> Optional[Dict]:
     if len(rows) < 3:
         return None
     
-    col_counts = [len(row) for row in rows]
-    max_cols = max(col_counts)
+    # Caso comum: tabela bem formada, todas as linhas com o mesmo nº de colunas (medido na extração)
+    max_cols = table["max_cols"]
+    if table["min_cols"] == max_cols:
+        return None
     
     # Procurar linha com coluna faltante
     for row_idx, row in enumerate(rows):
         if len(row) < max_cols and len(row) > 1:
             # Verificar se outras linhas têm dados naquele índice
-            has_data = any(parse_number_ptbr(row[i]) is not None for i in range(len(row)))
+            nums = table["rows_num"][row_idx]
+            has_data = nums.count(None) < len(nums)
             if has_data:
                 return {
                     "severity": "WARN",
@@ -194,7 +444,7 @@ def rule_missing_field_standardized_table(table: Dict) -> Optional[Dict]:
 def rule_disproportionate_distribution(table: Dict) -> Optional[Dict]:
     """Detecta distribuição muito desproporcional entre colunas (ex: Enem 4 vs 2205)"""
     rows = table.get("rows_raw", [])
-    headers = [normalize_text(h) for h in table.get("headers", [])]
+    headers = table.get("headers", [])
     
     if len(rows) < 2:
         return None
@@ -203,18 +453,19 @@ def rule_disproportionate_distribution(table: Dict) -> Optional[Dict]:
     col_1sem = None
     col_2sem = None
     for idx, h in enumerate(headers):
-        if '1º' in h or 'i semestre' in h.lower():
+        h_lower = h.lower()
+        if '1º' in h or 'i semestre' in h_lower:
             col_1sem = idx
-        if '2º' in h or 'ii semestre' in h.lower():
+        if '2º' in h or 'ii semestre' in h_lower:
             col_2sem = idx
     
     if col_1sem is None or col_2sem is None:
         return None
     
-    for row in rows:
+    for row, nums in zip(rows, table.get("rows_num", [])):
         if col_1sem < len(row) and col_2sem < len(row):
-            v1 = parse_number_ptbr(row[col_1sem])
-            v2 = parse_number_ptbr(row[col_2sem])
+            v1 = nums[col_1sem]
+            v2 = nums[col_2sem]
             
             if v1 and v2 and v1 > 0 and v2 > 0:
                 # Se proporção muito desproporcional (>100:1)
@@ -234,33 +485,30 @@ def rule_disproportionate_distribution(table: Dict) -> Optional[Dict]:
 def rule_abrupt_drop_series(table: Dict) -> Optional[Dict]:
     """Detecta queda abrupta >50% em série de anos"""
     rows = table.get("rows_raw", [])
-    headers = [normalize_text(h) for h in table.get("headers", [])]
+    headers = table.get("headers", [])
     
     if len(rows) < 2:
         return None
     
     year_cols = []
     for col_idx, header in enumerate(headers):
-        if re.match(r'^20\d{2}$', header):
+        if YEAR_HEADER_RE.match(header):
             year_cols.append((col_idx, header))
     
     if len(year_cols) < 2:
         return None
     
-    for row in rows:
-        vals = []
+    for row, nums in zip(rows, table.get("rows_num", [])):
+        # Compara cada ano com o anterior da linha e para na primeira queda
+        prev = None
         for col_idx, year in year_cols:
             if col_idx < len(row):
-                v = parse_number_ptbr(row[col_idx])
-                if v is not None and v > 0:
-                    vals.append((year, float(v)))
-        
-        if len(vals) >= 2:
-            for i in range(len(vals) - 1):
-                y0, v0 = vals[i]
-                y1, v1 = vals[i + 1]
-                
-                if v0 > 0:
+                v = nums[col_idx]
+                if v is None or v <= 0:
+                    continue
+                y1, v1 = year, float(v)
+                if prev is not None:
+                    y0, v0 = prev
                     pct_change = ((v1 - v0) / v0) * 100
                     # Queda >50% (ex: 52→4)
                     if pct_change < -50:
@@ -272,6 +520,7 @@ def rule_abrupt_drop_series(table: Dict) -> Optional[Dict]:
                             "detail": f"'{row[0]}': {y0}={v0:g} → {y1}={v1:g} ({pct_change:+.1f}%)",
                             "recommendation": "Validar se é erro ou mudança real de critério/política."
                         }
+                prev = (y1, v1)
     
     return None
 
@@ -282,36 +531,41 @@ def rule_sum_total_mismatch(table: Dict) -> Optional[Dict]:
     if len(rows) < 3:
         return None
     
-    # Procurar linha Total
-    total_idx = None
-    for i, row in enumerate(rows):
-        if row and re.match(r'^\s*total\b', normalize_text(row[0]), flags=re.IGNORECASE):
-            total_idx = i
-            break
-    
+    # Linha Total já localizada na extração
+    total_idx = table["total_idx"]
     if total_idx is None or total_idx < 2:
         return None
     
+    rows_num = table.get("rows_num", [])
+    total_nums = rows_num[total_idx]
+    n_cols = min(6, len(rows[0]))
+    
+    # Só as colunas 1..5 em que a própria linha Total tem número podem divergir: sem nenhuma, nem soma
+    check_cols = [c for c in range(1, min(n_cols, len(total_nums))) if total_nums[c] is not None]
+    if not check_cols:
+        return None
+    
+    # Somar essas colunas numa única passada pelas linhas acima do Total
+    # (int + float já promove para float, sem chamar float() por célula)
+    sums = [0.0] * n_cols
+    has_vals = [False] * n_cols
+    for r in rows_num[:total_idx]:
+        width = len(r)
+        for col_idx in check_cols:
+            if col_idx >= width:
+                break
+            v = r[col_idx]
+            if v is not None:
+                sums[col_idx] += v
+                has_vals[col_idx] = True
+    
     # Verificar coluna numérica
-    for col_idx in range(1, min(6, len(rows[0]) if rows else 0)):
-        soma = 0.0
-        has_vals = False
-        
-        for r in rows[:total_idx]:
-            if col_idx < len(r):
-                v = parse_number_ptbr(r[col_idx])
-                if v is not None:
-                    soma += float(v)
-                    has_vals = True
-        
-        if not has_vals:
+    for col_idx in check_cols:
+        if not has_vals[col_idx]:
             continue
         
-        total_cell = rows[total_idx][col_idx] if col_idx < len(rows[total_idx]) else ""
-        total_val = parse_number_ptbr(total_cell)
-        
-        if total_val is None:
-            continue
+        total_val = total_nums[col_idx]
+        soma = sums[col_idx]
         
         # Se soma é significativamente diferente do total
         diff = abs(soma - float(total_val))
@@ -333,17 +587,9 @@ def rule_blank_cells(table: Dict) -> Optional[Dict]:
     if not rows:
         return None
     
-    blanks = []
-    for r_i, row in enumerate(rows, 1):
-        for c_i, cell in enumerate(row, 1):
-            if normalize_text(cell) == "":
-                blanks.append((r_i, c_i))
-                if len(blanks) >= 8:
-                    break
-        if len(blanks) >= 8:
-            break
-    
-    if blanks and len(blanks) > 3:
+    # Posições das primeiras células vazias, coletadas na extração junto com a largura das linhas
+    blanks = table["blank_cells"]
+    if len(blanks) > 3:
         return {
             "severity": "WARN",
             "table": table["nome"],
@@ -354,29 +600,92 @@ def rule_blank_cells(table: Dict) -> Optional[Dict]:
         }
     return None
 
+# Regras independentes e somente-leitura sobre a tabela: a ordem aqui é a ordem do relatório
+TABLE_RULES = (
+    rule_missing_digit_in_number,
+    rule_identical_values_different_periods,
+    rule_missing_field_standardized_table,
+    rule_disproportionate_distribution,
+    rule_abrupt_drop_series,
+    rule_sum_total_mismatch,
+    rule_blank_cells,
+)
+
 def analyze_table(table: Dict, base_year: int) -> List[Dict]:
     issues = []
     
-    for rule in (
-        rule_missing_digit_in_number,
-        rule_identical_values_different_periods,
-        rule_missing_field_standardized_table,
-        rule_disproportionate_distribution,
-        rule_abrupt_drop_series,
-        rule_sum_total_mismatch,
-        rule_blank_cells,
-    ):
+    for rule in TABLE_RULES:
         out = rule(table)
         if out:
             issues.append(out)
     
     return issues
 
-def run_audit(url: str, report_year: int, base_year: int) -> List[Dict]:
+def analyze_html(html: str, base_year: int) -> Tuple[int, List[Dict]]:
+    """Parte CPU da auditoria (um único parse + regras), executada no pool de processos"""
+    tables = extract_tables_from_html(html)
     issues = []
-    html, diag = download_page(url)
+    for table in tables:
+        issues.extend(analyze_table(table, base_year))
+    return len(tables), issues
+
+# Resultados de auditoria: (url, report_year, base_year) -> (issues, fetched_at, hash do HTML).
+# Mesmo TTL das páginas, para um resultado em cache nunca ser mais velho que a página em cache;
+# vencido o TTL, a página é revalidada e, se o conteúdo não mudou, o resultado é reaproveitado
+AUDIT_CACHE_TTL = PAGE_CACHE_TTL
+AUDIT_CACHE_MAXSIZE = 64
+_audit_cache: OrderedDict = OrderedDict()
+
+# Resultado de analyze_html por hash do HTML: página já analisada nem vai para o pool.
+# Nenhuma regra de tabela lê base_year, então outro ano-base reaproveita a análise
+ANALYSIS_CACHE_MAXSIZE = 32
+_analysis_cache: OrderedDict = OrderedDict()
+
+async def analyze_in_pool(html: str, base_year: int) -> Tuple[int, List[Dict]]:
+    """Roda analyze_html no pool de processos, recriando o pool se um processo tiver morrido"""
+    global audit_executor
+    loop = asyncio.get_running_loop()
+    executor = audit_executor
+    try:
+        return await loop.run_in_executor(executor, analyze_html, html, base_year)
+    except BrokenProcessPool:
+        # Processo morto (OOM, segfault) inutiliza o pool: só a primeira auditoria a notar troca o pool
+        if audit_executor is executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+            audit_executor = new_audit_executor()
+        return await loop.run_in_executor(audit_executor, analyze_html, html, base_year)
+
+async def run_audit(url: str, report_year: int, base_year: int) -> List[Dict]:
+    key = (url, report_year, base_year)
+    cached = _audit_cache.get(key)
+    now = time.monotonic()
+    if cached and now - cached[1] < AUDIT_CACHE_TTL:
+        _audit_cache.move_to_end(key)
+        return cached[0]
     
-    if diag.get("contagem_tables", 0) == 0:
+    issues = []
+    html, diag = await download_page(url)
+    # Hash de páginas grandes fora do event loop
+    digest = await asyncio.to_thread(html_digest, html) if html else None
+    if cached and diag["sucesso"] and cached[2] == digest:
+        _audit_cache[key] = (cached[0], now, digest)
+        _audit_cache.move_to_end(key)
+        return cached[0]
+    
+    n_tables, table_issues = 0, []
+    # Página sem nenhuma <table> nem vai para o pool
+    if html and TABLE_OPEN_RE.search(html):
+        analysis = _analysis_cache.get(digest)
+        if analysis is not None:
+            _analysis_cache.move_to_end(digest)
+        else:
+            analysis = await analyze_in_pool(html, base_year)
+            _analysis_cache[digest] = analysis
+            while len(_analysis_cache) > ANALYSIS_CACHE_MAXSIZE:
+                _analysis_cache.popitem(last=False)
+        n_tables, table_issues = analysis
+    
+    if n_tables == 0:
         issues.append({
             "severity": "FAIL",
             "table": "Documento",
@@ -391,14 +700,19 @@ def run_audit(url: str, report_year: int, base_year: int) -> List[Dict]:
         "severity": "PASS",
         "table": "Documento",
         "rule": "scan_ok",
-        "issue": f"✓ {diag['contagem_tables']} tabela(s)",
+        "issue": f"✓ {n_tables} tabela(s)",
         "detail": f"HTML: {diag['tamanho_html_kb']:.1f} KB",
         "recommendation": "Analisando..."
     })
     
-    tables = extract_tables_from_html(html)
-    for table in tables:
-        issues.extend(analyze_table(table, base_year))
+    issues.extend(table_issues)
+    
+    # Só auditorias de páginas baixadas com sucesso entram no cache
+    if diag["sucesso"]:
+        _audit_cache[key] = (issues, now, digest)
+        _audit_cache.move_to_end(key)
+        while len(_audit_cache) > AUDIT_CACHE_MAXSIZE:
+            _audit_cache.popitem(last=False)
     
     return issues
 
@@ -563,22 +877,78 @@ HTML_FRONTEND = """<!DOCTYPE html>
 </html>
 """
 
+# Página servida sempre igual: codifica, comprime e calcula o ETag uma vez só, no import
+HTML_FRONTEND_BYTES = HTML_FRONTEND.encode("utf-8")
+HTML_FRONTEND_GZIP = gzip.compress(HTML_FRONTEND_BYTES, compresslevel=9, mtime=0)
+_html_frontend_hash = hashlib.md5(HTML_FRONTEND_BYTES).hexdigest()
+HTML_FRONTEND_ETAG = f'"{_html_frontend_hash}"'
+HTML_FRONTEND_GZIP_ETAG = f'"{_html_frontend_hash}-gzip"'
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    """Accept-Encoding aceita gzip? "gzip;q=0" recusa; sem gzip listado, vale o q do curinga '*'"""
+    qualities = {}
+    for part in accept_encoding.split(","):
+        coding, *params = part.split(";")
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        qualities[coding.strip().lower()] = q
+    q = qualities.get("gzip", qualities.get("x-gzip", qualities.get("*", 0.0)))
+    return q > 0
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match (RFC 9110): '*', lista separada por vírgulas e comparação fraca (W/ ignorado)"""
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
 @app.get("/", response_class=HTMLResponse)
-def root():
-    return HTML_FRONTEND
+def root(request: Request):
+    use_gzip = accepts_gzip(request.headers.get("accept-encoding", ""))
+    etag = HTML_FRONTEND_GZIP_ETAG if use_gzip else HTML_FRONTEND_ETAG
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    # Cada codificação tem sua ETag: só a da variante escolhida agora vale para o 304
+    if etag_matches(request.headers.get("if-none-match", ""), etag):
+        return Response(status_code=304, headers=headers)
+    if use_gzip:
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=HTML_FRONTEND_GZIP, media_type="text/html; charset=utf-8", headers=headers)
+    return Response(content=HTML_FRONTEND_BYTES, media_type="text/html; charset=utf-8", headers=headers)
 
 @app.get("/health")
 def health():
     return {"status": "ok"}
 
 @app.post("/audit")
-def audit(req: AuditRequest):
+async def audit(req: AuditRequest):
     try:
-        issues = run_audit(req.url, req.report_year, req.base_year)
+        issues = await run_audit(req.url, req.report_year, req.base_year)
         return {"status": "ok", "issues": issues}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@app.post("/audit/batch")
+async def audit_batch(req: BatchAuditRequest):
+    async def audit_one(url: str) -> List[Dict]:
+        async with audit_batch_sem:
+            return await run_audit(url, req.report_year, req.base_year)
+    
+    # URLs repetidas são auditadas uma vez só; a resposta mantém a ordem de chegada
+    urls = list(dict.fromkeys(req.urls))
+    outcomes = await asyncio.gather(*(audit_one(u) for u in urls), return_exceptions=True)
+    results = {}
+    for url, outcome in zip(urls, outcomes):
+        if isinstance(outcome, Exception):
+            results[url] = {"status": "error", "detail": str(outcome)}
+        else:
+            results[url] = {"status": "ok", "issues": outcome}
+    return {"status": "ok", "results": results}
+
 @app.post("/export/txt")
 def export_txt(data: dict):
     txt = generate_txt_report(
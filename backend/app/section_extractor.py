@@ -1,13 +1,17 @@
-import requests
+import re
 from bs4 import BeautifulSoup
 import pandas as pd
 from io import StringIO
 import logging
 from typing import List, Tuple, Optional, Dict, Any
-from app.config import REQUEST_TIMEOUT, USER_AGENT
+from app.config import REQUEST_TIMEOUT
+from app.http_session import session
 
 logger = logging.getLogger(__name__)
 
+# "Fonte:" costuma aparecer na caption ou no parágrafo logo abaixo da tabela
+FONTE_RE = re.compile(r"[Ff]onte:")
+
 
 class SectionExtractor:
     """Extrai conteúdo e tabelas de uma seção específica."""
@@ -19,8 +23,7 @@ class SectionExtractor:
     def fetch_page(self) -> BeautifulSoup:
         """Baixa a página HTML."""
         try:
-            headers = {"User-Agent": USER_AGENT}
-            response = requests.get(self.url, timeout=REQUEST_TIMEOUT, headers=headers)
+            response = session.get(self.url, timeout=REQUEST_TIMEOUT)
             response.raise_for_status()
             return BeautifulSoup(response.content, "lxml")
         except Exception as e:
@@ -47,7 +50,7 @@ class SectionExtractor:
         
         while current:
             if isinstance(current, str):
-                if current.strip():
+                if current and not current.isspace():
                     block_elements.append(current)
             else:
                 # Parar se encontrar header
@@ -57,7 +60,7 @@ class SectionExtractor:
             current = current.next_sibling
         
         # Criar novo objeto com os elementos
-        wrapper = BeautifulSoup("<div></div>", "html.parser")
+        wrapper = BeautifulSoup("<div></div>", "lxml")
         for elem in block_elements:
             if isinstance(elem, str):
                 wrapper.div.append(elem)
@@ -70,36 +73,67 @@ class SectionExtractor:
         """Extrai todo o texto da seção."""
         return soup.get_text(separator=" ", strip=True)
     
+    def read_dataframes(self, table_elems: List) -> List[Optional[pd.DataFrame]]:
+        """
+        Converte as tabelas em DataFrames com uma única chamada a pd.read_html.
+        Com tabela aninhada, ou se o pandas não devolver exatamente uma tabela por
+        <table> (tabela vazia, oculta ou com erro), lê tabela por tabela.
+        """
+        # Tabela aninhada vira DataFrame extra e pode compensar uma tabela descartada:
+        # a contagem bateria com os frames desalinhados das captions
+        nested = any(table.find("table") is not None for table in table_elems)
+        if not nested:
+            try:
+                # Só o HTML das tabelas vai para o pandas: scripts, CSS e texto corrido da seção ficam de fora
+                tables_html = "".join(str(table) for table in table_elems)
+                dataframes = pd.read_html(
+                    StringIO(tables_html),
+                    decimal=",",
+                    thousands=".",
+                    flavor="lxml"
+                )
+                if len(dataframes) == len(table_elems):
+                    return dataframes
+            except Exception as e:
+                logger.debug(f"Leitura em lote das tabelas falhou, lendo uma a uma: {e}")
+        
+        dataframes = []
+        for table in table_elems:
+            try:
+                df = pd.read_html(
+                    StringIO(str(table)),
+                    decimal=",",
+                    thousands=".",
+                    flavor="lxml"
+                )[0]
+                dataframes.append(df)
+            except Exception as e:
+                logger.warning(f"Erro ao parsear tabela: {e}")
+                dataframes.append(None)
+        return dataframes
+    
     def extract_tables(self, soup: BeautifulSoup) -> List[Dict[str, Any]]:
         """
         Extrai todas as tabelas <table> da seção.
         Para cada tabela: {dataframe, caption, table_html, notes_text, source}
         """
         tables = []
+        table_elems = soup.find_all("table")
+        dataframes = self.read_dataframes(table_elems)
         
-        for table in soup.find_all("table"):
+        for table, df in zip(table_elems, dataframes):
             table_data = {}
             
             # Caption
-            caption_elem = table.find("caption")
+            caption_elem = table.find("caption", recursive=False)
             caption = caption_elem.get_text(strip=True) if caption_elem else ""
             table_data["caption"] = caption
             
             # HTML da tabela
             table_data["table_html"] = str(table)
             
-            # Converter para DataFrame
-            try:
-                df = pd.read_html(
-                    StringIO(str(table)),
-                    decimal=",",
-                    thousands=".",
-                    flavor="lxml"
-                )[0]
-                table_data["dataframe"] = df
-            except Exception as e:
-                logger.warning(f"Erro ao parsear tabela: {e}")
-                table_data["dataframe"] = None
+            # DataFrame (None se a tabela não pôde ser lida)
+            table_data["dataframe"] = df
             
             # Notas: extrair até 10 siblings abaixo da tabela
             notes_parts = []
@@ -122,17 +156,20 @@ class SectionExtractor:
             notes_text = " ".join(notes_parts)
             table_data["notes_text"] = notes_text
             
-            # Detectar fonte
+            # Detectar fonte (caption primeiro, depois notas)
             source = ""
-            for text in [caption, notes_text]:
-                if "Fonte:" in text:
-                    # Extrair texto após "Fonte:"
-                    parts = text.split("Fonte:")
-                    if len(parts) > 1:
-                        source = parts[1].split("\n")[0].strip()
-                        break
+            has_source = False
+            for text in (caption, notes_text):
+                match = FONTE_RE.search(text)
+                if match:
+                    # Extrair texto após "Fonte:" até o fim da linha
+                    source = text[match.end():].split("\n", 1)[0].strip()
+                    has_source = True
+                    break
             
             table_data["source"] = source
+            # A R3 usa o resultado desta busca em vez de varrer caption/notas de novo
+            table_data["has_source"] = has_source
             tables.append(table_data)
         
         logger.info(f"Extraídas {len(tables)} tabelas da seção")
@@ -1,12 +1,15 @@
-import requests
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin, urlparse, urlunparse
-from typing import List, Tuple
-from app.config import REQUEST_TIMEOUT, USER_AGENT
+from typing import Dict, List, Tuple
+from app.config import REQUEST_TIMEOUT
+from app.http_session import session
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Trechos de classe CSS que sugerem um container de índice
+TOC_CLASS_HINTS = ("toc", "menu", "sidebar", "nav", "index")
+
 
 class TOCExtractor:
     """Extrai automaticamente o índice (TOC) de um site HTML."""
@@ -19,8 +22,7 @@ class TOCExtractor:
     def fetch_page(self, url: str) -> BeautifulSoup:
         """Baixa uma página HTML."""
         try:
-            headers = {"User-Agent": USER_AGENT}
-            response = requests.get(url, timeout=REQUEST_TIMEOUT, headers=headers)
+            response = session.get(url, timeout=REQUEST_TIMEOUT)
             response.raise_for_status()
             return BeautifulSoup(response.content, "lxml")
         except Exception as e:
@@ -64,43 +66,55 @@ class TOCExtractor:
         - procura por nav, aside, div com classe 'toc'|'menu'|'sidebar'
         - retorna elemento com maior número de <a> internos (mesmo domínio)
         """
-        candidates = []
+        link_counts = self._count_internal_links(soup)
         
-        # Candidatos óbvios
-        for tag_name in ["nav", "aside"]:
-            for tag in soup.find_all(tag_name):
-                links = self._count_internal_links(tag)
-                if links > 0:
-                    candidates.append((tag, links))
+        # Uma única varredura da árvore, separando nav/aside/div em baldes
+        navs, asides, hinted_divs, divs = [], [], [], []
+        for tag in soup.find_all(["nav", "aside", "div"]):
+            if tag.name == "nav":
+                navs.append(tag)
+            elif tag.name == "aside":
+                asides.append(tag)
+            else:
+                divs.append(tag)
+                classes = " ".join(tag.get("class") or []).lower()
+                if any(k in classes for k in TOC_CLASS_HINTS):
+                    hinted_divs.append(tag)
         
-        # Divs com classes sugestivas
-        for tag in soup.find_all("div", class_=lambda x: x and any(k in x.lower() for k in ["toc", "menu", "sidebar", "nav", "index"])):
-            links = self._count_internal_links(tag)
+        # Candidatos óbvios, depois divs com classes sugestivas
+        candidates = []
+        for tag in navs + asides + hinted_divs:
+            links = link_counts.get(id(tag), 0)
             if links > 0:
                 candidates.append((tag, links))
         
         # Se nenhum encontrado, pegar div com mais links internos
         if not candidates:
-            for tag in soup.find_all("div"):
-                links = self._count_internal_links(tag)
+            for tag in divs:
+                links = link_counts.get(id(tag), 0)
                 if links >= 5:  # threshold mínimo
                     candidates.append((tag, links))
         
         if candidates:
-            candidates.sort(key=lambda x: x[1], reverse=True)
-            return candidates[0][0]
+            # Só o primeiro colocado importa: max é uma passada e, no empate, fica com o primeiro candidato
+            return max(candidates, key=lambda x: x[1])[0]
         
         # Fallback: retornar soup inteira
         return soup
     
-    def _count_internal_links(self, tag) -> int:
-        """Conta quantos <a> internos existem em tag."""
-        count = 0
-        for link in tag.find_all("a", href=True):
+    def _count_internal_links(self, soup: BeautifulSoup) -> Dict[int, int]:
+        """
+        Conta os <a> internos de todos os elementos numa única passada:
+        cada link interno soma 1 em cada um dos seus ancestrais.
+        Retorna {id(tag): contagem}, evitando um find_all("a") por candidato.
+        """
+        counts: Dict[int, int] = {}
+        for link in soup.find_all("a", href=True):
             url, _ = self._normalize_url(link.get("href"))
             if url and self.domain in urlparse(url).netloc:
-                count += 1
-        return count
+                for parent in link.parents:
+                    counts[id(parent)] = counts.get(id(parent), 0) + 1
+        return counts
     
     def _infer_level(self, element, all_elements: List) -> int:
         """Infere o nível de aninhamento do elemento na árvore."""